@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Admission control for analysis requests
+Per-client token buckets, a bounded fair queue in front of a fixed number
+of concurrent slots, and load shedding when the projected wait is too long
+"""
+
+import math
+import time
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+
+
+class AdmissionRejected(Exception):
+    """Request was not admitted; carries the HTTP status and Retry-After seconds"""
+
+    def __init__(self, message, status_code, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity`"""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """Consume one token; return 0 on success or seconds until one is available"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self):
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class AdmissionController:
+    """
+    Gate in front of a pool of `max_concurrent` slots
+    Waiters are ordered by how much their client already has running or
+    queued, then by arrival, so one heavy client cannot starve the rest
+    """
+
+    MAX_BUCKETS = 10000
+
+    def __init__(self, name, max_concurrent, max_queue=20, max_wait=30.0,
+                 rate_per_min=10, burst=5, initial_service_time=5.0, clock=time.monotonic):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.rate = rate_per_min / 60.0
+        self.burst = burst
+        self.avg_service_time = float(initial_service_time)
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._buckets = {}
+        self._load = {}
+        self._waiting = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self.rejected = 0
+        self.admitted = 0
+
+    def _bucket(self, client_id):
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            if len(self._buckets) >= self.MAX_BUCKETS:
+                self._buckets = {k: b for k, b in self._buckets.items() if not b.is_full()}
+            bucket = TokenBucket(self.rate, self.burst, self.clock)
+            self._buckets[client_id] = bucket
+        return bucket
+
+    def estimated_wait(self, position=None):
+        """Projected seconds before the request at `position` in the queue gets a slot"""
+        if position is None:
+            position = len(self._waiting) + 1
+        free = self.max_concurrent - self._in_flight
+        if position <= free:
+            return 0.0
+        rounds = math.ceil((position - free) / self.max_concurrent)
+        return rounds * self.avg_service_time
+
+    def _reject(self, message, status_code, retry_after):
+        self.rejected += 1
+        return AdmissionRejected(message, status_code, retry_after)
+
+    def acquire(self, client_id):
+        """Block until a slot is granted, or raise AdmissionRejected"""
+        with self._cond:
+            retry_after = self._bucket(client_id).take()
+            if retry_after > 0:
+                raise self._reject("Rate limit exceeded for this client. Please slow down.", 429, retry_after)
+
+            if not self._waiting and self._in_flight < self.max_concurrent:
+                self._grant(client_id)
+                return
+
+            if len(self._waiting) >= self.max_queue:
+                raise self._reject("Server is busy: analysis queue is full.", 503, self.estimated_wait())
+
+            projected = self.estimated_wait()
+            if projected > self.max_wait:
+                raise self._reject(f"Server is busy: estimated wait {projected:.0f}s.", 503, projected)
+
+            entry = (self._load.get(client_id, 0), next(self._seq), client_id)
+            self._load[client_id] = self._load.get(client_id, 0) + 1
+            heapq.heappush(self._waiting, entry)
+
+            deadline = self.clock() + self.max_wait
+            while not (self._waiting[0] is entry and self._in_flight < self.max_concurrent):
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._drop_load(client_id)
+                    self._cond.notify_all()
+                    raise self._reject("Timed out waiting for an analysis slot.", 503, self.avg_service_time)
+                self._cond.wait(timeout=remaining)
+
+            heapq.heappop(self._waiting)
+            self._drop_load(client_id)
+            self._grant(client_id)
+            # The next waiter may also fit if several slots freed up at once
+            self._cond.notify_all()
+
+    def _grant(self, client_id):
+        self._in_flight += 1
+        self._load[client_id] = self._load.get(client_id, 0) + 1
+        self.admitted += 1
+
+    def _drop_load(self, client_id):
+        self._load[client_id] -= 1
+        if self._load[client_id] <= 0:
+            del self._load[client_id]
+
+    def release(self, client_id, elapsed=None):
+        """Free a slot and fold the service time into the running average"""
+        with self._cond:
+            self._in_flight -= 1
+            self._drop_load(client_id)
+            if elapsed is not None:
+                self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * elapsed
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, client_id):
+        """Hold a slot for the duration of the block"""
+        self.acquire(client_id)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(client_id, time.perf_counter() - started)
+
+    def status(self):
+        """Snapshot for /api/config"""
+        with self._cond:
+            return {
+                'capacity': self.max_concurrent,
+                'in_flight': self._in_flight,
+                'queue_depth': len(self._waiting),
+                'max_queue': self.max_queue,
+                'estimated_wait_s': round(self.estimated_wait(), 1),
+                'avg_service_time_s': round(self.avg_service_time, 2),
+                'admitted': self.admitted,
+                'rejected': self.rejected
+            }
@@ -10,13 +10,17 @@ import requests
 import sys
 from datetime import datetime
 import argparse
+import planner
+import pipeline
+from replay import ReplayClient, CassetteStore, CassetteMiss, MODES, DEFAULT_CASSETTE_DIR
 
 class AmplitudeExperimentAnalyzer:
-    def __init__(self, amplitude_api_key, amplitude_secret_key, groq_api_key):
+    def __init__(self, amplitude_api_key, amplitude_secret_key, groq_api_key, http_client=None):
         self.amplitude_api_key = amplitude_api_key
         self.amplitude_secret_key = amplitude_secret_key
         self.groq_api_key = groq_api_key
         self.amplitude_base_url = "https://amplitude.com/api/2"
+        self.http = http_client if http_client is not None else ReplayClient('off', transport=requests)
     
     def fetch_experiment_data(self, experiment_id):
         """Fetch experiment data from Amplitude"""
@@ -29,14 +33,14 @@ class AmplitudeExperimentAnalyzer:
         }
         
         try:
-            response = requests.get(url, headers=headers)
+            response = self.http.get(url, headers=headers, timeout=30)
             response.raise_for_status()
             data = response.json()
             
             print(f" Successfully fetched experiment data")
             return self.transform_amplitude_data(data)
         
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, CassetteMiss) as e:
             print(f" Error fetching from Amplitude: {e}")
             return None
     
@@ -120,7 +124,7 @@ Provide your analysis in the following JSON structure (respond ONLY with valid J
 }}"""
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 "https://api.groq.com/openai/v1/chat/completions",
                 headers={
                     "Content-Type": "application/json",
@@ -134,7 +138,8 @@ Provide your analysis in the following JSON structure (respond ONLY with valid J
                     }],
                     "temperature": 0.3,
                     "max_tokens": 4000
-                }
+                },
+                timeout=60
             )
             
             response.raise_for_status()
@@ -152,7 +157,7 @@ Provide your analysis in the following JSON structure (respond ONLY with valid J
             print(f" Error analyzing with AI: {e}")
             return None
     
-    def save_report(self, experiment_data, analysis, output_file):
+    def save_report(self, experiment_data, analysis, output_file, local_stats=None):
         """Save complete report to file"""
         report = {
             "experiment": experiment_data,
@@ -161,6 +166,8 @@ Provide your analysis in the following JSON structure (respond ONLY with valid J
             "tool_version": "1.0",
             "ai_provider": "Groq (FREE)"
         }
+        if local_stats is not None:
+            report["local_stats"] = local_stats
         
         with open(output_file, 'w') as f:
             json.dump(report, f, indent=2)
@@ -200,7 +207,75 @@ Provide your analysis in the following JSON structure (respond ONLY with valid J
         print("="*80)
 
 
+def plan_main(argv):
+    """`plan` subcommand: sample size, duration and MDE before launching a test"""
+    parser = argparse.ArgumentParser(
+        prog='amplitude_analyzer.py plan',
+        description='Plan sample size, duration and MDE for an experiment',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+Examples:
+  # Users needed to detect a 5% or 10% relative lift on a 15% conversion rate
+  python amplitude_analyzer.py plan --baseline 0.15 --lift 0.05 0.10 --daily-traffic 5000
+  
+  # Continuous metric (e.g. revenue per user), 3 arms, 90% power
+  python amplitude_analyzer.py plan --metric continuous --baseline 18.2 --std-dev 25 --lift 0.05 --arms 3 --power 0.9
+        '''
+    )
+    
+    parser.add_argument('--metric', choices=planner.METRIC_TYPES, default='binomial', help='Metric type')
+    parser.add_argument('--baseline', type=float, required=True, help='Baseline conversion rate (binomial) or mean (continuous)')
+    parser.add_argument('--std-dev', type=float, help='Standard deviation (continuous metrics)')
+    parser.add_argument('--lift', type=float, nargs='+', default=[0.05], help='Relative lift(s) to detect, e.g. 0.05 for 5%%')
+    parser.add_argument('--power', type=float, nargs='+', default=[0.8], help='Statistical power level(s)')
+    parser.add_argument('--arms', type=int, nargs='+', default=[2], help='Number of arms including control')
+    parser.add_argument('--alpha', type=float, default=planner.DEFAULT_ALPHA, help='Significance level')
+    parser.add_argument('--daily-traffic', type=int, help='Users entering the experiment per day')
+    parser.add_argument('--days', type=int, help='Planned duration, to report the reachable MDE')
+    parser.add_argument('--output', '-o', help='Also save the plan as JSON')
+    
+    args = parser.parse_args(argv)
+    
+    try:
+        result = planner.plan(
+            metric_type=args.metric,
+            baseline=args.baseline,
+            lifts=args.lift,
+            powers=args.power,
+            arms=args.arms,
+            alpha=args.alpha,
+            std_dev=args.std_dev,
+            daily_traffic=args.daily_traffic,
+            duration_days=args.days
+        )
+    except (ValueError, ArithmeticError) as e:
+        print(f" Error: {e}")
+        sys.exit(1)
+    
+    print("\n" + "="*80)
+    print(" EXPERIMENT PLAN")
+    print("="*80)
+    print(f"\n Metric: {args.metric}  Baseline: {args.baseline}  Alpha: {args.alpha}")
+    print()
+    print(f"   {'LIFT':>8} {'POWER':>6} {'ARMS':>5} {'USERS/ARM':>12} {'TOTAL':>12} {'DAYS':>6} {'MDE@DAYS':>9}")
+    for row in result['rows']:
+        days = row.get('days', '-')
+        mde = f"{row['mde_in_duration']:.2%}" if row.get('mde_in_duration') is not None else '-'
+        print(f"   {row['lift']:>8.2%} {row['power']:>6.0%} {row['arms']:>5} "
+              f"{row['users_per_arm']:>12,} {row['total_users']:>12,} {days:>6} {mde:>9}")
+    print("\n" + "="*80)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f" Plan saved to: {args.output}")
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'plan':
+        plan_main(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(
         description='Analyze Amplitude experiments with FREE AI',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -214,46 +289,97 @@ Examples:
   
   # Analyze from local JSON file
   python amplitude_analyzer.py --file experiment-data.json
+  
+  # Backfill a directory (or manifest) of experiment files; re-runs skip finished reports
+  python amplitude_analyzer.py --dir experiments/ --output-dir reports/ --concurrency 4
+  
+  # Plan sample size before launching (see: plan --help)
+  python amplitude_analyzer.py plan --baseline 0.15 --lift 0.05
+  
+  # Record live traffic, then re-run offline from the cassettes
+  python amplitude_analyzer.py --file experiment-data.json --replay-mode record
+  python amplitude_analyzer.py --file experiment-data.json --replay-mode replay
 
 Environment Variables:
   AMPLITUDE_API_KEY       Your Amplitude API key
   AMPLITUDE_SECRET_KEY    Your Amplitude secret key
   GROQ_API_KEY           Your Groq API key (FREE from console.groq.com)
+  REPLAY_MODE            off / record / replay (default: off)
+  REPLAY_CASSETTE_DIR    Cassette directory (default: cassettes)
         '''
     )
     
     parser.add_argument('--experiment', '-e', help='Amplitude experiment ID')
     parser.add_argument('--file', '-f', help='Local JSON file with experiment data')
     parser.add_argument('--output', '-o', default='experiment-analysis.json', help='Output file path')
+    parser.add_argument('--dir', '-d', help='Pipeline mode: directory of experiment JSON files')
+    parser.add_argument('--manifest', '-m', help='Pipeline mode: manifest file listing experiment files')
+    parser.add_argument('--output-dir', default='reports', help='Pipeline mode: report directory')
+    parser.add_argument('--workers', type=int, help='Pipeline mode: processes for CPU stages (default: CPU count)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Pipeline mode: concurrent LLM requests')
+    parser.add_argument('--no-resume', action='store_true', help='Pipeline mode: redo files that already have reports')
+    parser.add_argument('--replay-mode', choices=MODES, default=os.getenv('REPLAY_MODE', 'off').lower(),
+                        help='Record outbound calls to cassettes or replay them offline')
+    parser.add_argument('--cassette-dir', default=os.getenv('REPLAY_CASSETTE_DIR', DEFAULT_CASSETTE_DIR),
+                        help='Cassette directory for record/replay')
     
     args = parser.parse_args()
     
     amplitude_api_key = os.getenv('AMPLITUDE_API_KEY')
     amplitude_secret_key = os.getenv('AMPLITUDE_SECRET_KEY')
     groq_api_key = os.getenv('GROQ_API_KEY')
+    replaying = args.replay_mode == 'replay'
     
-    if not groq_api_key:
+    if not groq_api_key and not replaying:
         print(" Error: GROQ_API_KEY environment variable not set")
         print("   Get your FREE key at: https://console.groq.com")
         print("   Set it with: export GROQ_API_KEY='gsk_...'")
         sys.exit(1)
     
-    if not args.experiment and not args.file:
+    batch_source = args.dir or args.manifest
+    if not args.experiment and not args.file and not batch_source:
         parser.print_help()
         sys.exit(1)
     
+    # One pooled session for the whole run instead of a handshake per call
+    session = requests.Session()
+    session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=max(10, args.concurrency)))
+    http_client = ReplayClient(args.replay_mode, CassetteStore(args.cassette_dir), transport=session)
+    if args.replay_mode != 'off':
+        print(f" Replay mode: {args.replay_mode} ({len(http_client.store)} recordings in {args.cassette_dir})")
+    
     analyzer = AmplitudeExperimentAnalyzer(
         amplitude_api_key,
         amplitude_secret_key,
-        groq_api_key
+        groq_api_key,
+        http_client
     )
     
+    if batch_source:
+        try:
+            inputs = pipeline.discover_inputs(batch_source)
+            print(f" Pipeline: {len(inputs)} experiment file(s) -> {args.output_dir}")
+            summary = pipeline.run_pipeline(
+                analyzer,
+                inputs,
+                args.output_dir,
+                root=pipeline.input_root(batch_source),
+                workers=args.workers,
+                concurrency=args.concurrency,
+                resume=not args.no_resume
+            )
+        except ValueError as e:
+            print(f" Error: {e}")
+            sys.exit(1)
+        pipeline.print_pipeline_summary(summary)
+        sys.exit(1 if summary['failed'] else 0)
+    
     if args.file:
         print(f" Loading experiment data from {args.file}...")
         with open(args.file, 'r') as f:
             experiment_data = json.load(f)
     else:
-        if not amplitude_api_key or not amplitude_secret_key:
+        if (not amplitude_api_key or not amplitude_secret_key) and not replaying:
             print(" Error: AMPLITUDE_API_KEY and AMPLITUDE_SECRET_KEY required for fetching from Amplitude")
             print("   Set them with:")
             print("   export AMPLITUDE_API_KEY='your-key'")
@@ -4,17 +4,36 @@ Flask API for Amplitude Experiment Analyzer
 HYBRID MODE: Supports both server-side and user-provided API keys
 """
 
+import time
+
+_BOOT_STARTED = time.perf_counter()
+
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import json
-import requests
+import hashlib
+import threading
 from datetime import datetime
 import random
+from contextlib import nullcontext
+from replay import client_from_env
+from admission import AdmissionController, AdmissionRejected
+import planner
+
+STARTUP_TIMINGS = {'imports_ms': round((time.perf_counter() - _BOOT_STARTED) * 1000, 2)}
 
 app = Flask(__name__, static_folder='.')
 CORS(app)
 
+# Only trust X-Forwarded-For entries appended by our own proxies (Render adds one)
+_trusted_proxy_hops = int(os.getenv('TRUSTED_PROXY_HOPS', 0))
+if _trusted_proxy_hops:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=_trusted_proxy_hops)
+
+STARTUP_TIMINGS['app_ms'] = round((time.perf_counter() - _BOOT_STARTED) * 1000, 2)
+
 class KeyRotator:
     """Handles API key rotation for high availability"""
     
@@ -114,14 +133,17 @@ Provide your analysis in the following JSON structure (respond ONLY with valid J
   "report_narrative": "A comprehensive 3-4 paragraph narrative report"
 }}"""
         
+        requests = get_requests()
+        http = get_http_client()
+        
         try:
-            if not self.groq_api_key.startswith('gsk_'):
+            if http.mode != 'replay' and not self.groq_api_key.startswith('gsk_'):
                 raise Exception(f"Invalid Groq API key format. Key should start with 'gsk_'")
             
             print(f"[OK] API key format valid")
             print(f"[OK] Sending request to Groq...")
             
-            response = requests.post(
+            response = http.post(
                 "https://api.groq.com/openai/v1/chat/completions",
                 headers={
                     "Content-Type": "application/json",
@@ -196,7 +218,178 @@ Provide your analysis in the following JSON structure (respond ONLY with valid J
             raise Exception(f"Analysis failed: {str(e)}")
 
 
-key_rotator = KeyRotator()
+_lazy_lock = threading.Lock()
+_key_rotator = None
+_requests = None
+_http_client = None
+_admission = None
+_first_analysis_ms = None
+
+
+def get_key_rotator():
+    """Build the KeyRotator on first use instead of at import time"""
+    global _key_rotator
+    if _key_rotator is None:
+        with _lazy_lock:
+            if _key_rotator is None:
+                _key_rotator = KeyRotator()
+    return _key_rotator
+
+
+def get_requests():
+    """Import the requests HTTP client on first use (it is the slowest import)"""
+    global _requests
+    if _requests is None:
+        with _lazy_lock:
+            if _requests is None:
+                started = time.perf_counter()
+                import requests
+                STARTUP_TIMINGS['requests_import_ms'] = round((time.perf_counter() - started) * 1000, 2)
+                _requests = requests
+    return _requests
+
+
+def get_http_client():
+    """Outbound HTTP client; records or replays traffic when REPLAY_MODE is set"""
+    global _http_client
+    if _http_client is None:
+        transport = get_requests()
+        with _lazy_lock:
+            if _http_client is None:
+                _http_client = client_from_env(transport)
+                if _http_client.mode != 'off':
+                    print(f"[INFO] Replay mode: {_http_client.mode} ({len(_http_client.store)} recordings in {_http_client.store.directory})")
+    return _http_client
+
+
+def _admission_limits():
+    """Deployment-wide admission limits from the environment"""
+    return {
+        'server_concurrent': get_key_rotator().count() * int(os.getenv('ADMISSION_PER_KEY_CONCURRENCY', 2)),
+        'user_concurrent': int(os.getenv('USER_KEY_MAX_CONCURRENT', 8)),
+        'max_queue': int(os.getenv('ADMISSION_MAX_QUEUE', 20)),
+        'burst': int(os.getenv('ADMISSION_BURST', 5)),
+        'max_wait': float(os.getenv('ADMISSION_MAX_WAIT_S', 30)),
+        'server_rate_per_min': float(os.getenv('ADMISSION_RATE_PER_MIN', 10)),
+        'user_rate_per_min': float(os.getenv('USER_KEY_RATE_PER_MIN', 30))
+    }
+
+
+def max_admission_workers():
+    """
+    Most worker processes the limits can be split across
+    Every worker needs at least one slot, queue entry and burst token, so
+    more workers than the smallest integer limit would exceed it
+    """
+    limits = _admission_limits()
+    caps = [limits['user_concurrent'], limits['max_queue'], limits['burst']]
+    if limits['server_concurrent']:
+        caps.append(limits['server_concurrent'])
+    return max(1, min(caps))
+
+
+def _per_worker(value):
+    """Split a deployment-wide limit across gunicorn workers (each keeps its own state)"""
+    workers = max(1, int(os.getenv('ADMISSION_WORKER_COUNT', 1)))
+    return max(1, int(value // workers))
+
+
+def _fit_threads(max_concurrent, max_queue, reserve):
+    """
+    Cap running + queued requests below the worker's thread count
+    Waiters block a gthread thread, so without this a full server-key queue
+    would leave no thread for user-key requests or /api/health on that worker.
+    With no room left to queue, requests are shed instead of blocking
+    """
+    threads = os.getenv('ADMISSION_WORKER_THREADS')
+    if not threads:
+        return max_concurrent, max_queue
+    budget = max(1, int(threads) - reserve)
+    max_concurrent = min(max_concurrent, budget)
+    return max_concurrent, min(max_queue, budget - max_concurrent)
+
+
+def get_admission():
+    """
+    Admission controllers, one per key pool
+    Server-key requests share the KeyRotator pool; user-key requests have
+    their own slots so they never queue behind it. Limits are configured
+    per deployment and divided by ADMISSION_WORKER_COUNT (set by
+    gunicorn.conf.py), then fitted inside each worker's thread budget
+    """
+    global _admission
+    if _admission is None:
+        limits = _admission_limits()
+        with _lazy_lock:
+            if _admission is None:
+                max_queue = _per_worker(limits['max_queue'])
+                burst = _per_worker(limits['burst'])
+                # Server-key work leaves 2 threads free (user-key + health), user-key leaves 1
+                server_concurrent, server_queue = _fit_threads(
+                    _per_worker(limits['server_concurrent']), max_queue,
+                    int(os.getenv('ADMISSION_THREAD_RESERVE', 2)))
+                user_concurrent, user_queue = _fit_threads(
+                    _per_worker(limits['user_concurrent']), max_queue, 1)
+                workers = max(1, int(os.getenv('ADMISSION_WORKER_COUNT', 1)))
+                _admission = {
+                    'server': AdmissionController(
+                        'server',
+                        max_concurrent=server_concurrent,
+                        max_queue=server_queue,
+                        max_wait=limits['max_wait'],
+                        rate_per_min=limits['server_rate_per_min'] / workers,
+                        burst=burst
+                    ),
+                    'user': AdmissionController(
+                        'user',
+                        max_concurrent=user_concurrent,
+                        max_queue=user_queue,
+                        max_wait=limits['max_wait'],
+                        rate_per_min=limits['user_rate_per_min'] / workers,
+                        burst=burst
+                    )
+                }
+    return _admission
+
+
+def _allowed_client_tokens():
+    """Client tokens issued by us (ADMISSION_CLIENT_TOKENS, comma-separated)"""
+    return {token.strip() for token in os.getenv('ADMISSION_CLIENT_TOKENS', '').split(',') if token.strip()}
+
+
+def get_client_id():
+    """
+    Identify the tenant for rate limiting and fair queuing
+    X-Client-Token is honored only if allow-listed; otherwise the caller's
+    IP, which ProxyFix resolves from trusted proxy hops only
+    """
+    token = request.headers.get('X-Client-Token')
+    if token and token in _allowed_client_tokens():
+        return f"token:{hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]}"
+    return f"ip:{request.remote_addr}"
+
+
+def warm_up():
+    """Load lazy components ahead of traffic (called by gunicorn before forking)"""
+    started = time.perf_counter()
+    get_key_rotator()
+    get_requests()
+    get_http_client()
+    get_admission()
+    STARTUP_TIMINGS['warm_up_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def is_ready():
+    """Ready once every lazy component has been loaded"""
+    return _key_rotator is not None and _requests is not None and _http_client is not None and _admission is not None
+
+
+def _record_first_analysis():
+    """Track cold-start-to-first-analysis latency for this process"""
+    global _first_analysis_ms
+    if _first_analysis_ms is None:
+        _first_analysis_ms = round((time.perf_counter() - _BOOT_STARTED) * 1000, 2)
+        print(f"[INFO] Cold start to first analysis: {_first_analysis_ms} ms")
 
 
 @app.route('/')
@@ -225,10 +418,16 @@ def analyze():
         if 'variants' not in experiment_data:
             return jsonify({'error': 'Invalid experiment data: missing variants'}), 400
         
+        key_rotator = get_key_rotator()
+        
         if user_api_key:
             print(f"[INFO] Using user-provided API key")
             groq_api_key = user_api_key
             key_source = "user"
+        elif get_http_client().mode == 'replay':
+            print(f"[INFO] Replaying recorded Groq responses")
+            groq_api_key = key_rotator.get_key() or 'replay'
+            key_source = "replay"
         else:
             groq_api_key = key_rotator.get_key()
             if not groq_api_key:
@@ -243,8 +442,13 @@ def analyze():
         print(f"[INFO] Variants: {list(experiment_data['variants'].keys())}")
         print(f"[INFO] Key source: {key_source}")
         
+        admission = get_admission().get(key_source)
+        gate = admission.admit(get_client_id()) if admission else nullcontext()
+        
         analyzer = AmplitudeExperimentAnalyzer(groq_api_key)
-        analysis = analyzer.analyze_with_ai(experiment_data)
+        with gate:
+            analysis = analyzer.analyze_with_ai(experiment_data)
+        _record_first_analysis()
         
         response_data = {
             **analysis,
@@ -256,6 +460,16 @@ def analyze():
         
         return jsonify(response_data)
     
+    except AdmissionRejected as e:
+        print(f"[WARNING] Request not admitted ({e.status_code}): {str(e)}")
+        response = jsonify({
+            'error': str(e),
+            'retry_after': e.retry_after
+        })
+        response.status_code = e.status_code
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    
     except Exception as e:
         error_msg = str(e)
         print(f"[ERROR] Error in analyze endpoint: {error_msg}")
@@ -267,18 +481,52 @@ def analyze():
         return jsonify(response), 500
 
 
+@app.route('/api/plan', methods=['POST'])
+def plan():
+    """
+    Sample-size / duration / MDE planner
+    Pure computation (no AI call), so it is not subject to admission control
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid plan request: body must be a JSON object'}), 400
+    
+    try:
+        result = planner.plan(
+            metric_type=data.get('metric_type', 'binomial'),
+            baseline=data.get('baseline'),
+            lifts=data.get('lifts', data.get('lift')),
+            powers=data.get('powers', data.get('power')),
+            arms=data.get('arms'),
+            alpha=data.get('alpha', planner.DEFAULT_ALPHA),
+            std_dev=data.get('std_dev'),
+            daily_traffic=data.get('daily_traffic'),
+            duration_days=data.get('duration_days')
+        )
+    except (TypeError, ValueError, ArithmeticError) as e:
+        return jsonify({'error': f"Invalid plan request: {str(e) or type(e).__name__}"}), 400
+    
+    return jsonify(result)
+
+
 @app.route('/api/config', methods=['GET'])
 def config():
     """
     Return configuration info for frontend
     Tells UI whether to show "Use Your Own Key" option
     """
-    server_key_available = key_rotator.has_keys()
+    key_rotator = get_key_rotator()
+    replay_mode = get_http_client().mode
+    server_key_available = key_rotator.has_keys() or replay_mode == 'replay'
     
     return jsonify({
         'server_key_available': server_key_available,
-        'server_key_count': key_rotator.count() if server_key_available else 0,
+        'server_key_count': key_rotator.count(),
         'hybrid_mode': True,
+        'replay_mode': replay_mode,
+        'admission': {name: controller.status() for name, controller in get_admission().items()},
         'features': {
             'use_server_key': server_key_available,
             'use_own_key': True,
@@ -290,7 +538,7 @@ def config():
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    server_keys = key_rotator.count()
+    server_keys = get_key_rotator().count()
     
     return jsonify({
         'status': 'healthy',
@@ -300,16 +548,40 @@ def health():
     })
 
 
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """
+    Readiness check endpoint
+    Unlike /api/health (process is up), this loads the lazy components
+    and reports 200 only once the worker can serve an analysis
+    """
+    try:
+        if not is_ready():
+            warm_up()
+    except Exception as e:
+        print(f"[ERROR] Warm-up failed: {str(e)}")
+        return jsonify({'status': 'not_ready', 'error': str(e)}), 503
+    
+    return jsonify({
+        'status': 'ready',
+        'uptime_ms': round((time.perf_counter() - _BOOT_STARTED) * 1000, 2),
+        'startup_timings_ms': STARTUP_TIMINGS,
+        'first_analysis_ms': _first_analysis_ms,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
 @app.route('/api/test-groq', methods=['GET'])
 def test_groq():
     """Test Groq API connection with server keys"""
     try:
+        key_rotator = get_key_rotator()
         groq_api_key = key_rotator.get_key()
         if not groq_api_key:
             return jsonify({'error': 'No server API keys configured'}), 500
         
         print("[INFO] Testing Groq API connection...")
-        response = requests.post(
+        response = get_requests().post(
             "https://api.groq.com/openai/v1/chat/completions",
             headers={
                 "Content-Type": "application/json",
@@ -347,6 +619,7 @@ if __name__ == '__main__':
     print(f"Starting Hybrid Experiment Analyzer on port {port}...")
     print("=" * 60)
     
+    key_rotator = get_key_rotator()
     if key_rotator.has_keys():
         print(f"[OK] Server API keys configured: {key_rotator.count()} key(s)")
         print(f"[OK] Key rotation: {'ENABLED' if key_rotator.count() > 1 else 'DISABLED'}")
@@ -354,6 +627,7 @@ if __name__ == '__main__':
         print(f"[WARNING] No server API keys configured")
         print(f"[INFO] Users will need to provide their own Groq API keys")
     
+    get_http_client()
     print(f"[OK] Hybrid mode: ENABLED")
     print(f"[OK] Users can choose: Server key OR their own key")
     print("=" * 60)
@@ -0,0 +1,45 @@
+"""
+Gunicorn config preset for Experiment Analyzer
+Tuned for scale-to-zero hosting: preload once, warm up, then fork workers
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Import api.py once in the master so forked workers share the loaded code
+preload_app = True
+
+# Analysis requests spend most of their time waiting on Groq, so threads
+# per worker are cheaper than extra processes
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Admission state lives in each worker and api.py divides its limits by the
+# worker count, so never run more workers than the smallest limit can be
+# split across (each worker keeps at least one slot / token)
+import api
+
+workers = int(os.getenv('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8, api.max_admission_workers())))
+if workers > api.max_admission_workers():
+    print(f"[WARNING] WEB_CONCURRENCY={workers} exceeds what the admission limits can be split across "
+          f"({api.max_admission_workers()}); deployment-wide limits will be exceeded")
+
+os.environ['ADMISSION_WORKER_COUNT'] = str(workers)
+os.environ['ADMISSION_WORKER_THREADS'] = str(threads)
+
+# Groq requests time out after 60s; leave headroom for the response
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 90))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """Load lazy components in the master before workers are forked"""
+    import api
+    api.warm_up()
+    server.log.info(f"[OK] Warm-up complete: {api.STARTUP_TIMINGS}")
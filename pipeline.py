@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Batch pipeline for the CLI analyzer
+Streams experiment files through load -> validate -> local stats -> LLM ->
+save_report. CPU stages run on a process pool, the LLM call and report
+write on a bounded thread pool, and finished reports are skipped on re-runs
+"""
+
+import os
+import json
+import math
+import hashlib
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from statistics import NormalDist
+
+_NORMAL = NormalDist()
+
+
+def discover_inputs(path):
+    """
+    Experiment files from a directory (*.json) or a manifest (.json list or one path per line)
+    Raises ValueError for a missing path or a malformed manifest
+    """
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.endswith('.json')
+        )
+    if not os.path.exists(path):
+        raise ValueError(f"{path} does not exist")
+
+    base = os.path.dirname(os.path.abspath(path))
+    try:
+        with open(path, 'r') as f:
+            if path.endswith('.json'):
+                entries = json.load(f)
+            else:
+                lines = (line.strip() for line in f)
+                entries = [line for line in lines if line and not line.startswith('#')]
+    except OSError as e:
+        raise ValueError(f"could not read manifest {path}: {e}")
+    except ValueError as e:
+        raise ValueError(f"manifest {path} is not valid JSON: {e}")
+
+    if not isinstance(entries, list) or not all(isinstance(entry, str) and entry for entry in entries):
+        raise ValueError(f"manifest {path} must be a list of non-empty file paths")
+
+    return [entry if os.path.isabs(entry) else os.path.join(base, entry) for entry in entries]
+
+
+def input_root(path):
+    """Directory that report names are made relative to: the input dir, or the manifest's dir"""
+    return path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+
+
+def output_path_for(input_path, output_dir, root=None):
+    """
+    Report path for an input file: <output_dir>/<relative path>-analysis.json
+    Subdirectories are flattened with '__' (a/x.json -> a__x-analysis.json);
+    files outside `root` get a short hash of their absolute path instead
+    """
+    absolute = os.path.abspath(input_path)
+    relative = os.path.relpath(absolute, os.path.abspath(root)) if root else os.path.basename(absolute)
+
+    if relative.startswith(os.pardir + os.sep) or os.path.isabs(relative):
+        digest = hashlib.sha256(absolute.encode('utf-8')).hexdigest()[:8]
+        relative = f"{os.path.splitext(os.path.basename(absolute))[0]}-{digest}"
+    else:
+        relative = os.path.splitext(relative)[0]
+
+    return os.path.join(output_dir, f"{relative.replace(os.sep, '__')}-analysis.json")
+
+
+def plan_outputs(inputs, output_dir, root=None):
+    """Map each input to its report path; raise ValueError if two inputs would share one"""
+    outputs = {}
+    claimed = {}
+    for path in inputs:
+        output_path = output_path_for(path, output_dir, root)
+        if output_path in claimed:
+            raise ValueError(f"{path} and {claimed[output_path]} would both write {output_path}")
+        claimed[output_path] = path
+        outputs[path] = output_path
+    return outputs
+
+
+def is_completed(output_path):
+    """A report counts as done only if it parses and has an analysis"""
+    if not os.path.exists(output_path):
+        return False
+    try:
+        with open(output_path, 'r') as f:
+            return bool(json.load(f).get('analysis'))
+    except (OSError, ValueError):
+        return False
+
+
+def validate_experiment_data(experiment_data):
+    """Return a list of problems; empty means the data can be analyzed"""
+    if not isinstance(experiment_data, dict):
+        return ["top level must be a JSON object"]
+
+    variants = experiment_data.get('variants')
+    if not isinstance(variants, dict) or not variants:
+        return ["missing variants"]
+
+    errors = []
+    if len(variants) < 2:
+        errors.append("need at least 2 variants")
+    for key, variant in variants.items():
+        if not isinstance(variant, dict):
+            errors.append(f"variant '{key}' must be an object")
+            continue
+        missing = [field for field in ('users', 'conversions') if not isinstance(variant.get(field), (int, float))]
+        if missing:
+            errors.append(f"variant '{key}' missing numeric {', '.join(missing)}")
+        elif variant['users'] <= 0:
+            errors.append(f"variant '{key}' has no users")
+        elif not 0 <= variant['conversions'] <= variant['users']:
+            errors.append(f"variant '{key}' conversions must be between 0 and users")
+    return errors
+
+
+def compute_local_stats(experiment_data):
+    """Two-proportion z-test of each variant against control"""
+    variants = experiment_data['variants']
+    control_key = 'control' if 'control' in variants else next(iter(variants))
+    control = variants[control_key]
+    p1 = control['conversions'] / control['users']
+
+    results = {}
+    for key, variant in variants.items():
+        if key == control_key:
+            continue
+
+        p2 = variant['conversions'] / variant['users']
+        pooled = (control['conversions'] + variant['conversions']) / (control['users'] + variant['users'])
+        se = math.sqrt(pooled * (1 - pooled) * (1 / control['users'] + 1 / variant['users']))
+        z = (p2 - p1) / se if se > 0 else 0.0
+        p_value = 2 * (1 - _NORMAL.cdf(abs(z)))
+
+        results[key] = {
+            'conversion_rate': round(p2, 6),
+            'absolute_lift': round(p2 - p1, 6),
+            'relative_lift': round((p2 - p1) / p1, 6) if p1 else None,
+            'z_score': round(z, 4),
+            'p_value': round(p_value, 6),
+            'is_significant': p_value < 0.05
+        }
+
+    return {
+        'control': control_key,
+        'control_conversion_rate': round(p1, 6),
+        'test': 'two-proportion z-test',
+        'variants': results
+    }
+
+
+def prepare(input_path):
+    """CPU stages (runs in a worker process): load, validate, local stats"""
+    started = time.perf_counter()
+    try:
+        with open(input_path, 'r') as f:
+            experiment_data = json.load(f)
+    except (OSError, ValueError) as e:
+        return {'path': input_path, 'error': f"load failed: {e}"}
+
+    errors = validate_experiment_data(experiment_data)
+    if errors:
+        return {'path': input_path, 'error': f"invalid: {'; '.join(errors)}"}
+
+    return {
+        'path': input_path,
+        'experiment_data': experiment_data,
+        'local_stats': compute_local_stats(experiment_data),
+        'cpu_seconds': time.perf_counter() - started
+    }
+
+
+def _analyze_and_save(analyzer, prepared, output_path):
+    """Network stage (runs in a thread): LLM call, then write the report"""
+    started = time.perf_counter()
+    analysis = analyzer.analyze_with_ai(prepared['experiment_data'])
+    if not analysis:
+        return {'path': prepared['path'], 'error': "AI analysis failed"}
+
+    try:
+        analyzer.save_report(prepared['experiment_data'], analysis, output_path, prepared['local_stats'])
+    except OSError as e:
+        return {'path': prepared['path'], 'error': f"save failed: {e}"}
+    return {'path': prepared['path'], 'llm_seconds': time.perf_counter() - started}
+
+
+def run_pipeline(analyzer, inputs, output_dir, root=None, workers=None, concurrency=4, resume=True):
+    """
+    Process every input and return a summary dict
+    Raises ValueError before doing any work if two inputs map to one report
+    At most `workers * 4` files are prepared ahead, and new files are only
+    prepared while fewer than `concurrency * 2` wait on the LLM, so memory
+    stays flat for large backfills
+    """
+    started = time.perf_counter()
+    outputs = plan_outputs(inputs, output_dir, root)
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    summary = {'total': len(inputs), 'completed': 0, 'skipped': 0, 'failed': 0,
+               'cpu_seconds': 0.0, 'llm_seconds': 0.0, 'failures': []}
+
+    todo = []
+    for path in inputs:
+        if resume and is_completed(outputs[path]):
+            summary['skipped'] += 1
+        else:
+            todo.append(path)
+
+    if summary['skipped']:
+        print(f" Resuming: {summary['skipped']} already completed, {len(todo)} to go")
+
+    cpu_window = workers * 4
+    net_window = concurrency * 2
+    pending_inputs = iter(todo)
+    cpu_futures = set()
+    net_futures = set()
+
+    def record_failure(result):
+        summary['failed'] += 1
+        summary['failures'].append({'path': result['path'], 'error': result['error']})
+        print(f" Failed {result['path']}: {result['error']}")
+
+    with ProcessPoolExecutor(max_workers=workers) as cpu_pool, \
+            ThreadPoolExecutor(max_workers=concurrency) as net_pool:
+
+        def fill_cpu():
+            # Backpressure: stop preparing while the LLM stage is saturated
+            while len(cpu_futures) < cpu_window and len(net_futures) < net_window:
+                path = next(pending_inputs, None)
+                if path is None:
+                    return
+                cpu_futures.add(cpu_pool.submit(prepare, path))
+
+        fill_cpu()
+        while cpu_futures or net_futures:
+            done, _ = wait(cpu_futures | net_futures, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                result = future.result()
+
+                if future in cpu_futures:
+                    cpu_futures.remove(future)
+                    if 'error' in result:
+                        record_failure(result)
+                        continue
+                    summary['cpu_seconds'] += result['cpu_seconds']
+                    net_futures.add(net_pool.submit(_analyze_and_save, analyzer, result, outputs[result['path']]))
+                else:
+                    net_futures.remove(future)
+                    if 'error' in result:
+                        record_failure(result)
+                        continue
+                    summary['completed'] += 1
+                    summary['llm_seconds'] += result['llm_seconds']
+
+            fill_cpu()
+
+    summary['elapsed_seconds'] = time.perf_counter() - started
+    return summary
+
+
+def print_pipeline_summary(summary):
+    """End-of-run throughput summary"""
+    elapsed = summary['elapsed_seconds']
+    processed = summary['completed'] + summary['failed']
+
+    print("\n" + "="*80)
+    print(" PIPELINE SUMMARY")
+    print("="*80)
+    print(f"   Files:      {summary['total']}")
+    print(f"   Completed:  {summary['completed']}")
+    print(f"   Skipped:    {summary['skipped']} (already done)")
+    print(f"   Failed:     {summary['failed']}")
+    print(f"   Elapsed:    {elapsed:.2f}s")
+    print(f"   Throughput: {processed / elapsed if elapsed > 0 else 0:.2f} files/s")
+    if summary['completed']:
+        print(f"   Avg LLM:    {summary['llm_seconds'] / summary['completed']:.2f}s per file")
+    if processed:
+        print(f"   CPU stages: {summary['cpu_seconds']:.2f}s total")
+    print("="*80)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Pre-analysis sample-size and power planner
+Closed-form normal-approximation formulas for binomial and continuous
+metrics, memoized so repeated lookups (UI sliders) are cache hits
+"""
+
+import math
+from functools import lru_cache
+from itertools import product
+from statistics import NormalDist
+
+METRIC_TYPES = ('binomial', 'continuous')
+
+DEFAULT_ALPHA = 0.05
+
+# Planning is exposed over HTTP, so keep one request's CPU work bounded
+MAX_LIST_LENGTH = 50
+MAX_GRID_ROWS = 500
+
+_NORMAL = NormalDist()
+
+
+def _key(value):
+    """Normalize float inputs so 0.1 and 0.1000000001 share a cache entry"""
+    return round(float(value), 6)
+
+
+@lru_cache(maxsize=1024)
+def z_score(quantile):
+    """Standard normal quantile"""
+    return _NORMAL.inv_cdf(quantile)
+
+
+def _z_terms(alpha, power, arms):
+    """Two-sided z for alpha (Bonferroni over arms-1 comparisons) and z for power"""
+    comparisons = max(1, arms - 1)
+    return z_score(_key(1 - alpha / (2 * comparisons))), z_score(_key(power))
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _normalize(metric_type, baseline, lift, alpha, power, arms, std_dev):
+    """
+    Check inputs and return them rounded to cache keys
+    Range checks run on the rounded values, since those are what the math
+    uses (a lift of 1e-7 passes as non-zero but rounds to 0.0)
+    """
+    for name, value in (('baseline', baseline), ('alpha', alpha), ('power', power)):
+        if not _is_number(value):
+            raise ValueError(f"{name} must be a finite number")
+    if lift is not None and not _is_number(lift):
+        raise ValueError("lift must be a finite number")
+    if std_dev is not None and not _is_number(std_dev):
+        raise ValueError("std_dev must be a finite number")
+    if not isinstance(arms, int) or isinstance(arms, bool):
+        raise ValueError("arms must be an integer")
+    if metric_type not in METRIC_TYPES:
+        raise ValueError(f"metric_type must be one of: {', '.join(METRIC_TYPES)}")
+
+    baseline = _key(baseline)
+    lift = _key(lift) if lift is not None else None
+    alpha = _key(alpha)
+    power = _key(power)
+    std_dev = _key(std_dev) if std_dev is not None else None
+
+    if not 0 < alpha < 1:
+        raise ValueError("alpha must be between 0 and 1")
+    if not 0 < power < 1:
+        raise ValueError("power must be between 0 and 1")
+    if arms < 2:
+        raise ValueError("arms must be at least 2 (control + 1 variant)")
+    if lift is not None and lift == 0:
+        raise ValueError("lift must be non-zero (at least 1e-6)")
+    if metric_type == 'binomial':
+        if not 0 < baseline < 1:
+            raise ValueError("baseline conversion rate must be between 0 and 1 (at least 1e-6)")
+        if lift is not None and not 0 < baseline * (1 + lift) < 1:
+            raise ValueError("baseline * (1 + lift) must stay between 0 and 1")
+        if lift is not None and baseline * lift == 0:
+            raise ValueError("baseline * lift is too small to plan for")
+    else:
+        if baseline == 0:
+            raise ValueError("baseline mean must be non-zero (at least 1e-6 in size)")
+        if not std_dev or std_dev <= 0:
+            raise ValueError("std_dev is required and must be positive (at least 1e-6) for continuous metrics")
+
+    return baseline, lift, alpha, power, arms, std_dev
+
+
+@lru_cache(maxsize=65536)
+def _sample_size(metric_type, baseline, lift, alpha, power, arms, std_dev):
+    z_alpha, z_power = _z_terms(alpha, power, arms)
+
+    if metric_type == 'binomial':
+        p1 = baseline
+        p2 = baseline * (1 + lift)
+        p_bar = (p1 + p2) / 2
+        numerator = (z_alpha * math.sqrt(2 * p_bar * (1 - p_bar))
+                     + z_power * math.sqrt(p1 * (1 - p1) + p2 * (1 - p2))) ** 2
+        return math.ceil(numerator / (p2 - p1) ** 2)
+
+    delta = baseline * lift
+    return math.ceil(2 * ((z_alpha + z_power) * std_dev / delta) ** 2)
+
+
+def required_sample_size(metric_type, baseline, lift, alpha=DEFAULT_ALPHA, power=0.8, arms=2, std_dev=None):
+    """
+    Users needed per arm to detect a relative `lift` over `baseline`
+    baseline is a conversion rate (binomial) or a mean (continuous)
+    """
+    normalized = _normalize(metric_type, baseline, lift, alpha, power, arms, std_dev)
+    try:
+        return _sample_size(metric_type, *normalized)
+    except OverflowError:
+        raise ValueError("required sample size is too large to compute; check std_dev and lift")
+
+
+@lru_cache(maxsize=65536)
+def _mde(metric_type, baseline, users_per_arm, alpha, power, arms, std_dev):
+    z_alpha, z_power = _z_terms(alpha, power, arms)
+
+    if metric_type == 'binomial':
+        absolute = (z_alpha + z_power) * math.sqrt(2 * baseline * (1 - baseline) / users_per_arm)
+    else:
+        absolute = (z_alpha + z_power) * std_dev * math.sqrt(2 / users_per_arm)
+    return absolute / abs(baseline)
+
+
+def minimum_detectable_effect(metric_type, baseline, users_per_arm, alpha=DEFAULT_ALPHA, power=0.8, arms=2, std_dev=None):
+    """Smallest relative lift detectable with `users_per_arm` users in each arm"""
+    baseline, _, alpha, power, arms, std_dev = _normalize(metric_type, baseline, None, alpha, power, arms, std_dev)
+    if not isinstance(users_per_arm, int) or isinstance(users_per_arm, bool) or users_per_arm <= 0:
+        raise ValueError("users_per_arm must be a positive integer")
+    return _mde(metric_type, baseline, users_per_arm, alpha, power, arms, std_dev)
+
+
+def _as_list(name, value, default):
+    if value is None:
+        return list(default)
+    if not isinstance(value, (list, tuple)):
+        return [value]
+    if not value:
+        raise ValueError(f"{name} must not be empty")
+    if len(value) > MAX_LIST_LENGTH:
+        raise ValueError(f"{name} has {len(value)} values; at most {MAX_LIST_LENGTH} allowed")
+    return list(value)
+
+
+def _positive(name, value, integer=False):
+    """Optional positive number (or integer) input"""
+    if value is None:
+        return None
+    valid_type = isinstance(value, int) if integer else _is_number(value)
+    if isinstance(value, bool) or not valid_type or value <= 0:
+        raise ValueError(f"{name} must be a positive {'integer' if integer else 'number'}")
+    return value
+
+
+def plan(metric_type='binomial', baseline=None, lifts=None, powers=None, arms=None,
+         alpha=DEFAULT_ALPHA, std_dev=None, daily_traffic=None, duration_days=None):
+    """
+    Build a planning grid over lifts x powers x arm counts
+    Each row has users per arm, total users and (given daily_traffic) days
+    needed; with duration_days as well, also the MDE reachable in that time
+    """
+    if baseline is None:
+        raise ValueError("baseline is required")
+    daily_traffic = _positive('daily_traffic', daily_traffic)
+    duration_days = _positive('duration_days', duration_days, integer=True)
+
+    lifts = _as_list('lifts', lifts, [0.05])
+    powers = _as_list('powers', powers, [0.8])
+    arms = _as_list('arms', arms, [2])
+    grid_rows = len(lifts) * len(powers) * len(arms)
+    if grid_rows > MAX_GRID_ROWS:
+        raise ValueError(f"grid has {grid_rows} rows; at most {MAX_GRID_ROWS} allowed")
+
+    rows = []
+    for lift, power, arm_count in product(lifts, powers, arms):
+        per_arm = required_sample_size(metric_type, baseline, lift, alpha, power, arm_count, std_dev)
+        row = {
+            'lift': lift,
+            'power': power,
+            'arms': arm_count,
+            'users_per_arm': per_arm,
+            'total_users': per_arm * arm_count
+        }
+        if daily_traffic:
+            row['days'] = math.ceil(per_arm * arm_count / daily_traffic)
+            if duration_days:
+                reachable = daily_traffic * duration_days / arm_count
+                if not math.isfinite(reachable):
+                    raise ValueError("daily_traffic * duration_days is too large")
+                # Under one user per arm in the window: nothing is detectable
+                row['mde_in_duration'] = round(
+                    minimum_detectable_effect(metric_type, baseline, int(reachable), alpha, power, arm_count, std_dev), 6
+                ) if reachable >= 1 else None
+        rows.append(row)
+
+    return {
+        'metric_type': metric_type,
+        'baseline': baseline,
+        'alpha': alpha,
+        'std_dev': std_dev,
+        'daily_traffic': daily_traffic,
+        'duration_days': duration_days,
+        'rows': rows
+    }
+
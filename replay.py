@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Record/Replay layer for outbound Groq and Amplitude calls
+Records request/response pairs into a local cassette store and replays
+them offline, so analyses can be re-run without any network access
+"""
+
+import os
+import json
+import fcntl
+import hashlib
+import threading
+from datetime import datetime
+
+MODES = ('off', 'record', 'replay')
+DEFAULT_CASSETTE_DIR = 'cassettes'
+_INDEX_FILE = 'index.json'
+
+
+def _write_atomic(path, data):
+    """Write JSON via a per-process temp file and rename, so readers never see partial files"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when no recording matches a request"""
+
+
+class RecordedResponse:
+    """Minimal stand-in for requests.Response built from a cassette entry"""
+
+    def __init__(self, url, status_code, text):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        """Mirror requests' behaviour so callers handle replayed errors the same way"""
+        if self.status_code >= 400:
+            import requests
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error (replayed) for url: {self.url}",
+                response=self
+            )
+
+
+class CassetteStore:
+    """
+    Indexed on-disk store of request/response pairs
+    One content-addressed <key>.json file per recording; index.json is a
+    listing merged under a file lock so several processes can record at once.
+    Entries are cached in memory after the first read
+    """
+
+    def __init__(self, directory=DEFAULT_CASSETTE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._cache = {}
+        self.index = self._load_index()
+
+    def _load_index(self):
+        """Load the index, or start an empty one"""
+        path = os.path.join(self.directory, _INDEX_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    @staticmethod
+    def key_for(method, url, payload=None):
+        """Stable match key from method, URL and JSON body (headers carry API keys, so are excluded)"""
+        raw = json.dumps({
+            'method': method.upper(),
+            'url': url,
+            'json': payload
+        }, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the recorded entry for a key, or None"""
+        if key in self._cache:
+            return self._cache[key]
+
+        # Resolve by filename so recordings made by other processes are found
+        path = os.path.join(self.directory, f"{key}.json")
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'r') as f:
+            entry = json.load(f)
+        self._cache[key] = entry
+        return entry
+
+    def put(self, key, method, url, payload, status_code, text):
+        """Write a recording and merge it into the on-disk index"""
+        entry = {
+            'request': {'method': method.upper(), 'url': url, 'json': payload},
+            'response': {'status_code': status_code, 'text': text},
+            'recorded_at': datetime.now().isoformat()
+        }
+        filename = f"{key}.json"
+
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            _write_atomic(os.path.join(self.directory, filename), entry)
+            self._cache[key] = entry
+
+            with open(os.path.join(self.directory, f"{_INDEX_FILE}.lock"), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self.index = self._load_index()
+                    self.index[key] = {
+                        'file': filename,
+                        'method': method.upper(),
+                        'url': url,
+                        'recorded_at': entry['recorded_at']
+                    }
+                    _write_atomic(os.path.join(self.directory, _INDEX_FILE), self.index)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __len__(self):
+        return len(self.index)
+
+
+class ReplayClient:
+    """
+    Drop-in for the parts of the requests API we use (get/post)
+    off: pass through, record: call live and store 2xx, replay: serve from store
+    """
+
+    def __init__(self, mode='off', store=None, transport=None):
+        if mode not in MODES:
+            raise ValueError(f"Invalid replay mode '{mode}'. Use one of: {', '.join(MODES)}")
+
+        self.mode = mode
+        self.store = store if store is not None else CassetteStore()
+        self._transport = transport
+
+    @property
+    def transport(self):
+        """Live HTTP client, imported only when a request actually goes out"""
+        if self._transport is None:
+            import requests
+            self._transport = requests
+        return self._transport
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        if self.mode == 'off':
+            return self.transport.request(method, url, **kwargs)
+
+        payload = kwargs.get('json')
+        key = self.store.key_for(method, url, payload)
+
+        if self.mode == 'replay':
+            entry = self.store.get(key)
+            if entry is None:
+                raise CassetteMiss(f"No recorded response for {method.upper()} {url} (key {key[:12]})")
+            response = entry['response']
+            return RecordedResponse(url, response['status_code'], response['text'])
+
+        response = self.transport.request(method, url, **kwargs)
+        # Only successes are recorded: a 429/401/5xx must not replace a good
+        # recording or be replayed as if it were the real answer
+        if 200 <= response.status_code < 300:
+            self.store.put(key, method, url, payload, response.status_code, response.text)
+        return response
+
+
+def client_from_env(transport=None):
+    """Build a ReplayClient from REPLAY_MODE / REPLAY_CASSETTE_DIR"""
+    mode = os.getenv('REPLAY_MODE', 'off').lower()
+    directory = os.getenv('REPLAY_CASSETTE_DIR', DEFAULT_CASSETTE_DIR)
+    return ReplayClient(mode, CassetteStore(directory), transport)
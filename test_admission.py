@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Unit tests for admission.py
+Run with: python -m pytest test_admission.py
+"""
+
+import os
+import time
+import threading
+import unittest
+from unittest import mock
+
+from admission import AdmissionController, AdmissionRejected, TokenBucket
+
+
+class FakeClock:
+    """Manually advanced clock; `step` advances it on every read"""
+
+    def __init__(self, step=0.0):
+        self.now = 1000.0
+        self.step = step
+
+    def __call__(self):
+        value = self.now
+        self.now += self.step
+        return value
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.001)
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_refills_at_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+
+        self.assertEqual(bucket.take(), 0.0)
+        self.assertEqual(bucket.take(), 0.0)
+        self.assertAlmostEqual(bucket.take(), 1.0)
+
+        clock.advance(0.5)
+        self.assertAlmostEqual(bucket.take(), 0.5)
+
+        clock.advance(0.5)
+        self.assertEqual(bucket.take(), 0.0)
+
+    def test_never_exceeds_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+        clock.advance(60)
+        self.assertTrue(bucket.is_full())
+        self.assertEqual(bucket.tokens, 2)
+
+
+class AdmissionControllerTest(unittest.TestCase):
+
+    def test_rate_limit_returns_429_with_retry_after(self):
+        clock = FakeClock()
+        controller = AdmissionController('t', max_concurrent=5, rate_per_min=60, burst=1, clock=clock)
+
+        with controller.admit('a'):
+            pass
+        with self.assertRaises(AdmissionRejected) as ctx:
+            controller.acquire('a')
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertEqual(ctx.exception.retry_after, 1)
+
+        # Other clients have their own bucket
+        with controller.admit('b'):
+            pass
+
+        clock.advance(1)
+        with controller.admit('a'):
+            pass
+
+    def test_sheds_when_projected_wait_too_long(self):
+        controller = AdmissionController('t', max_concurrent=1, max_wait=5, rate_per_min=600,
+                                         burst=10, initial_service_time=10, clock=FakeClock())
+        controller.acquire('a')
+
+        with self.assertRaises(AdmissionRejected) as ctx:
+            controller.acquire('b')
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(ctx.exception.retry_after, 10)
+        self.assertEqual(controller.status()['queue_depth'], 0)
+
+    def test_sheds_when_queue_full(self):
+        controller = AdmissionController('t', max_concurrent=1, max_queue=0, rate_per_min=600,
+                                         burst=10, clock=FakeClock())
+        controller.acquire('a')
+
+        with self.assertRaises(AdmissionRejected) as ctx:
+            controller.acquire('b')
+        self.assertEqual(ctx.exception.status_code, 503)
+
+    def test_timed_out_waiter_is_removed(self):
+        # Each clock read moves time forward, so the wait deadline passes quickly
+        controller = AdmissionController('t', max_concurrent=1, max_wait=1, rate_per_min=600,
+                                         burst=10, initial_service_time=0.1, clock=FakeClock(step=0.4))
+        controller.acquire('a')
+
+        with self.assertRaises(AdmissionRejected) as ctx:
+            controller.acquire('b')
+        self.assertEqual(ctx.exception.status_code, 503)
+
+        status = controller.status()
+        self.assertEqual(status['queue_depth'], 0)
+        self.assertEqual(status['in_flight'], 1)
+        self.assertNotIn('b', controller._load)
+
+        controller.release('a')
+        with controller.admit('c'):
+            pass
+
+    def test_light_client_is_served_before_heavy_backlog(self):
+        controller = AdmissionController('t', max_concurrent=1, max_wait=30, rate_per_min=600,
+                                         burst=10, initial_service_time=0.1, clock=FakeClock())
+        controller.acquire('heavy')
+        order = []
+
+        def job(client_id):
+            with controller.admit(client_id):
+                order.append(client_id)
+
+        threads = []
+        for i, client_id in enumerate(['heavy', 'heavy', 'heavy', 'light']):
+            thread = threading.Thread(target=job, args=(client_id,))
+            thread.start()
+            threads.append(thread)
+            wait_for(lambda: controller.status()['queue_depth'] == i + 1)
+
+        controller.release('heavy')
+        for thread in threads:
+            thread.join(timeout=2)
+
+        self.assertEqual(order, ['light', 'heavy', 'heavy', 'heavy'])
+        self.assertEqual(controller.status()['in_flight'], 0)
+
+
+class WorkerSplitTest(unittest.TestCase):
+    """How api.py sizes per-worker controllers under gunicorn"""
+
+    def setUp(self):
+        import api
+        self.api = api
+
+    def test_limits_divided_across_workers(self):
+        with mock.patch.dict(os.environ, {'ADMISSION_WORKER_COUNT': '4'}):
+            self.assertEqual(self.api._per_worker(20), 5)
+            self.assertEqual(self.api._per_worker(2), 1)
+
+    def test_worker_cap_keeps_total_within_smallest_limit(self):
+        env = {'GROQ_API_KEY': 'gsk_a', 'ADMISSION_PER_KEY_CONCURRENCY': '2'}
+        with mock.patch.dict(os.environ, env), mock.patch.object(self.api, '_key_rotator', None):
+            self.assertEqual(self.api.max_admission_workers(), 2)
+
+    def test_waiters_leave_threads_free(self):
+        with mock.patch.dict(os.environ, {'ADMISSION_WORKER_THREADS': '4'}):
+            self.assertEqual(self.api._fit_threads(1, 10, 2), (1, 1))
+            self.assertEqual(self.api._fit_threads(4, 10, 1), (3, 0))
+
+    def test_no_thread_cap_outside_gunicorn(self):
+        with mock.patch.dict(os.environ, {}, clear=False):
+            os.environ.pop('ADMISSION_WORKER_THREADS', None)
+            self.assertEqual(self.api._fit_threads(4, 10, 2), (4, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,6 +12,19 @@ import time
 from subprocess import Popen, PIPE
 import signal
 
+def wait_for_ready(url, timeout=30, interval=0.1):
+    """Poll the readiness endpoint until the server can serve analyses"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return True
+        except requests.exceptions.ConnectionError:
+            pass
+        time.sleep(interval)
+    return False
+
+
 def test_local_server():
     """Test the Flask server locally"""
     
@@ -31,8 +44,13 @@ def test_local_server():
     print("\n Starting Flask server...")
     server = Popen(['python', 'api.py'], stdout=PIPE, stderr=PIPE)
     
-    print(" Waiting for server to start...")
-    time.sleep(3)
+    print(" Waiting for server to become ready...")
+    started = time.time()
+    ready = wait_for_ready('http://localhost:5000/api/ready')
+    if ready:
+        print(f" Server ready in {time.time() - started:.2f}s")
+    else:
+        print(" Server did not report ready, continuing anyway...")
     
     try:
         print("\n Testing health endpoint...")
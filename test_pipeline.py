@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Unit tests for pipeline.py
+Run with: python -m pytest test_pipeline.py
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+
+import pipeline
+
+
+class StubAnalyzer:
+    """Stands in for AmplitudeAnalyzer: canned analysis, real report writes"""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def analyze_with_ai(self, experiment_data):
+        with self._lock:
+            self.calls.append(experiment_data['name'])
+        return {'executive_summary': f"analysis of {experiment_data['name']}"}
+
+    def save_report(self, experiment_data, analysis, output_file, local_stats=None):
+        with open(output_file, 'w') as f:
+            json.dump({'experiment': experiment_data, 'analysis': analysis, 'local_stats': local_stats}, f)
+
+
+def experiment(name, control=(1000, 100), treatment=(1000, 130)):
+    return {
+        'name': name,
+        'variants': {
+            'control': {'users': control[0], 'conversions': control[1]},
+            'treatment': {'users': treatment[0], 'conversions': treatment[1]}
+        }
+    }
+
+
+class PipelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.tmp, 'out')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, relative, data):
+        path = os.path.join(self.tmp, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+        return path
+
+    def run_pipeline(self, analyzer, inputs, **kwargs):
+        return pipeline.run_pipeline(analyzer, inputs, self.output_dir, root=self.tmp,
+                                     workers=1, concurrency=2, **kwargs)
+
+
+class OutputPathTest(PipelineTestCase):
+
+    def test_same_basename_in_different_dirs_does_not_overwrite(self):
+        # Regression: a/x.json and b/x.json used to both write x-analysis.json
+        inputs = [self.write('a/x.json', experiment('a')), self.write('b/x.json', experiment('b'))]
+        summary = self.run_pipeline(StubAnalyzer(), inputs)
+
+        self.assertEqual(summary['completed'], 2)
+        reports = sorted(os.listdir(self.output_dir))
+        self.assertEqual(reports, ['a__x-analysis.json', 'b__x-analysis.json'])
+        with open(os.path.join(self.output_dir, 'b__x-analysis.json')) as f:
+            self.assertEqual(json.load(f)['experiment']['name'], 'b')
+
+    def test_files_outside_root_get_distinct_names(self):
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside)
+        first = pipeline.output_path_for(os.path.join(outside, 'one', 'x.json'), 'out', self.tmp)
+        second = pipeline.output_path_for(os.path.join(outside, 'two', 'x.json'), 'out', self.tmp)
+        self.assertNotEqual(first, second)
+
+    def test_duplicate_outputs_rejected_before_any_work(self):
+        path = self.write('x.json', experiment('x'))
+        analyzer = StubAnalyzer()
+        with self.assertRaises(ValueError):
+            self.run_pipeline(analyzer, [path, path])
+        self.assertEqual(analyzer.calls, [])
+        self.assertFalse(os.path.exists(self.output_dir))
+
+
+class ResumeTest(PipelineTestCase):
+
+    def test_completed_reports_are_skipped(self):
+        inputs = [self.write('x.json', experiment('x')), self.write('y.json', experiment('y'))]
+        self.run_pipeline(StubAnalyzer(), inputs)
+
+        analyzer = StubAnalyzer()
+        summary = self.run_pipeline(analyzer, inputs)
+        self.assertEqual(summary['skipped'], 2)
+        self.assertEqual(analyzer.calls, [])
+
+        summary = self.run_pipeline(analyzer, inputs, resume=False)
+        self.assertEqual(summary['completed'], 2)
+
+    def test_is_completed_requires_parsed_analysis(self):
+        self.assertFalse(pipeline.is_completed(os.path.join(self.tmp, 'missing.json')))
+        self.assertFalse(pipeline.is_completed(self.write('partial.json', '{"analysis": ')))
+        self.assertFalse(pipeline.is_completed(self.write('empty.json', {'analysis': None})))
+        self.assertTrue(pipeline.is_completed(self.write('done.json', {'analysis': {'ok': True}})))
+
+    def test_invalid_input_is_reported_not_written(self):
+        inputs = [self.write('bad.json', {'variants': {}}), self.write('good.json', experiment('good'))]
+        summary = self.run_pipeline(StubAnalyzer(), inputs)
+        self.assertEqual((summary['completed'], summary['failed']), (1, 1))
+        self.assertIn('missing variants', summary['failures'][0]['error'])
+
+
+class ValidationTest(unittest.TestCase):
+
+    def test_valid_experiment(self):
+        self.assertEqual(pipeline.validate_experiment_data(experiment('x')), [])
+
+    def test_problems(self):
+        cases = [
+            ([], "top level must be a JSON object"),
+            ({}, "missing variants"),
+            ({'variants': {'control': {'users': 10, 'conversions': 1}}}, "need at least 2 variants"),
+            (experiment('x', treatment=(0, 0)), "has no users"),
+            (experiment('x', treatment=(10, 11)), "between 0 and users"),
+            ({'variants': {'control': {'users': 10}, 'b': 'x'}}, "missing numeric conversions"),
+        ]
+        for data, message in cases:
+            with self.subTest(message=message):
+                errors = pipeline.validate_experiment_data(data)
+                self.assertTrue(any(message in error for error in errors), errors)
+
+
+class LocalStatsTest(unittest.TestCase):
+
+    def test_two_proportion_z_test(self):
+        # 10% vs 13% on 1000 users each: pooled p = 0.115, z ~= 2.103, p ~= 0.035
+        stats = pipeline.compute_local_stats(experiment('x'))
+        treatment = stats['variants']['treatment']
+
+        self.assertEqual(stats['control'], 'control')
+        self.assertEqual(stats['control_conversion_rate'], 0.1)
+        self.assertAlmostEqual(treatment['absolute_lift'], 0.03)
+        self.assertAlmostEqual(treatment['relative_lift'], 0.3)
+        self.assertAlmostEqual(treatment['z_score'], 2.1027, places=3)
+        self.assertAlmostEqual(treatment['p_value'], 0.0356, places=3)
+        self.assertTrue(treatment['is_significant'])
+
+    def test_no_difference_is_not_significant(self):
+        stats = pipeline.compute_local_stats(experiment('x', treatment=(1000, 100)))
+        treatment = stats['variants']['treatment']
+        self.assertEqual(treatment['z_score'], 0)
+        self.assertFalse(treatment['is_significant'])
+
+    def test_zero_conversions_everywhere(self):
+        stats = pipeline.compute_local_stats(experiment('x', control=(100, 0), treatment=(100, 0)))
+        treatment = stats['variants']['treatment']
+        self.assertIsNone(treatment['relative_lift'])
+        self.assertEqual(treatment['p_value'], 1.0)
+
+
+class DiscoverInputsTest(PipelineTestCase):
+
+    def test_directory(self):
+        self.write('data/b.json', {})
+        self.write('data/a.json', {})
+        self.write('data/notes.txt', '')
+        found = pipeline.discover_inputs(os.path.join(self.tmp, 'data'))
+        self.assertEqual([os.path.basename(path) for path in found], ['a.json', 'b.json'])
+
+    def test_text_manifest_skips_comments_and_blanks(self):
+        manifest = self.write('inputs.txt', "# header\n  # indented comment\n\nx.json\n  /abs/y.json  \n")
+        self.assertEqual(pipeline.discover_inputs(manifest), [os.path.join(self.tmp, 'x.json'), '/abs/y.json'])
+
+    def test_json_manifest(self):
+        manifest = self.write('inputs.json', ['x.json', 'sub/y.json'])
+        self.assertEqual(pipeline.discover_inputs(manifest),
+                         [os.path.join(self.tmp, 'x.json'), os.path.join(self.tmp, 'sub', 'y.json')])
+
+    def test_bad_sources_raise_value_error(self):
+        sources = [
+            os.path.join(self.tmp, 'missing'),
+            self.write('numbers.json', ['x.json', 3]),
+            self.write('object.json', {'files': ['x.json']}),
+            self.write('broken.json', '["x.json"'),
+        ]
+        for source in sources:
+            with self.subTest(source=os.path.basename(source)):
+                with self.assertRaises(ValueError):
+                    pipeline.discover_inputs(source)
+
+
+if __name__ == '__main__':
+    unittest.main()
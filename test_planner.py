@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Unit tests for planner.py
+Run with: python -m pytest test_planner.py
+"""
+
+import math
+import unittest
+from statistics import NormalDist
+
+import planner
+
+
+def cohens_h_sample_size(p1, p2, alpha=0.05, power=0.8):
+    """Independent reference: arcsine-transform (Cohen's h) per-arm sample size"""
+    z = NormalDist().inv_cdf
+    h = 2 * math.asin(math.sqrt(p2)) - 2 * math.asin(math.sqrt(p1))
+    return 2 * ((z(1 - alpha / 2) + z(power)) / h) ** 2
+
+
+class SampleSizeTest(unittest.TestCase):
+
+    def test_textbook_binomial_value(self):
+        # 10% -> 12% at alpha 0.05, 80% power: 3,841 per arm (pooled-variance formula)
+        self.assertEqual(planner.required_sample_size('binomial', 0.10, 0.20), 3841)
+
+    def test_matches_independent_reference(self):
+        # 15% baseline, 5% relative lift, 80% power
+        n = planner.required_sample_size('binomial', 0.15, 0.05)
+        self.assertEqual(n, 36310)
+        self.assertAlmostEqual(n / cohens_h_sample_size(0.15, 0.1575), 1, delta=0.005)
+
+    def test_continuous(self):
+        # 2 * ((1.96 + 0.8416) * 5 / 0.5)^2 = 1569.8
+        self.assertEqual(planner.required_sample_size('continuous', 10, 0.05, std_dev=5), 1570)
+
+    def test_more_power_needs_more_users(self):
+        low = planner.required_sample_size('binomial', 0.15, 0.05, power=0.8)
+        high = planner.required_sample_size('binomial', 0.15, 0.05, power=0.9)
+        self.assertGreater(high, low)
+
+    def test_bonferroni_arm_correction(self):
+        # 3 arms = 2 comparisons against control, so alpha is halved
+        three_arms = planner.required_sample_size('binomial', 0.15, 0.05, arms=3)
+        halved_alpha = planner.required_sample_size('binomial', 0.15, 0.05, alpha=0.025)
+        self.assertEqual(three_arms, halved_alpha)
+        self.assertGreater(three_arms, planner.required_sample_size('binomial', 0.15, 0.05, arms=2))
+
+
+class MinimumDetectableEffectTest(unittest.TestCase):
+
+    def test_round_trip_binomial(self):
+        # n users per arm for a lift should detect roughly that lift
+        n = planner.required_sample_size('binomial', 0.15, 0.10)
+        mde = planner.minimum_detectable_effect('binomial', 0.15, n)
+        self.assertAlmostEqual(mde, 0.10, delta=0.01)
+
+    def test_round_trip_continuous(self):
+        n = planner.required_sample_size('continuous', 20, 0.05, std_dev=12)
+        mde = planner.minimum_detectable_effect('continuous', 20, n, std_dev=12)
+        self.assertAlmostEqual(mde, 0.05, delta=0.001)
+        self.assertLessEqual(mde, 0.05)
+
+
+class PlanTest(unittest.TestCase):
+
+    def test_grid_rows_and_days(self):
+        result = planner.plan(baseline=0.15, lifts=[0.05, 0.1], powers=[0.8, 0.9], arms=[2, 3],
+                              daily_traffic=5000, duration_days=14)
+        self.assertEqual(len(result['rows']), 8)
+        row = result['rows'][0]
+        self.assertEqual(row['total_users'], row['users_per_arm'] * row['arms'])
+        self.assertEqual(row['days'], math.ceil(row['total_users'] / 5000))
+        self.assertIsNotNone(row['mde_in_duration'])
+
+    def test_no_reachable_users_reports_none(self):
+        result = planner.plan(baseline=0.15, arms=[3], daily_traffic=1, duration_days=1)
+        self.assertIsNone(result['rows'][0]['mde_in_duration'])
+
+    def test_rejects_bad_inputs(self):
+        bad = [
+            dict(baseline=0.15, lifts=[1e-7]),
+            dict(baseline=1e-7),
+            dict(baseline=0.15, arms=2.5),
+            dict(baseline=0.15, daily_traffic=-100),
+            dict(baseline=0.15, daily_traffic=10, duration_days=1.5),
+            dict(baseline=0.15, daily_traffic=1e308, duration_days=10 ** 6),
+            dict(baseline='x'),
+            dict(baseline=0.15, lifts=[0.1] * (planner.MAX_LIST_LENGTH + 1)),
+            dict(baseline=0.15, lifts=[0.01] * 40, powers=[0.8] * 40),
+            dict(metric_type='continuous', baseline=10, lifts=[0.05]),
+            dict(metric_type='continuous', baseline=10, lifts=[0.05], std_dev=float('inf')),
+            dict(metric_type='continuous', baseline=10, lifts=[0.05], std_dev=1e-7),
+            dict(metric_type='continuous', baseline=10, lifts=[0.05], std_dev=1e300),
+        ]
+        for kwargs in bad:
+            with self.subTest(kwargs=kwargs):
+                with self.assertRaises(ValueError):
+                    planner.plan(**kwargs)
+
+
+class PlanEndpointTest(unittest.TestCase):
+
+    def setUp(self):
+        import api
+        self.client = api.app.test_client()
+
+    def test_ok(self):
+        response = self.client.post('/api/plan', json={'baseline': 0.15, 'lifts': [0.05]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['rows'][0]['users_per_arm'], 36310)
+
+    def test_bad_inputs_are_400(self):
+        for body in ([1, 2], {'baseline': 1e-7}, {'baseline': 0.15, 'lifts': [1e-7]},
+                     {'metric_type': 'continuous', 'baseline': 10, 'std_dev': 1e300}):
+            with self.subTest(body=body):
+                self.assertEqual(self.client.post('/api/plan', json=body).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Unit tests for replay.py
+Run with: python -m pytest test_replay.py
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+
+from replay import CassetteMiss, CassetteStore, ReplayClient
+
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.text = json.dumps(body)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeTransport:
+    """Returns queued responses in order and records the calls made"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.responses.pop(0)
+
+
+class ReplayClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def post(self, client, prompt, api_key='gsk_a'):
+        return client.post(GROQ_URL, headers={'Authorization': f"Bearer {api_key}"},
+                           json={'messages': [{'role': 'user', 'content': prompt}]}, timeout=60)
+
+    def test_record_then_replay_round_trip(self):
+        transport = FakeTransport(FakeResponse(200, {'answer': 42}))
+        self.post(ReplayClient('record', CassetteStore(self.directory), transport), 'hello')
+        self.assertEqual(len(transport.calls), 1)
+
+        # A fresh store reads from disk; headers (API key) do not affect matching
+        replayer = ReplayClient('replay', CassetteStore(self.directory), FakeTransport())
+        response = self.post(replayer, 'hello', api_key='gsk_other')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'answer': 42})
+        response.raise_for_status()
+
+        self.assertEqual(len(CassetteStore(self.directory)), 1)
+
+    def test_replay_miss_raises(self):
+        replayer = ReplayClient('replay', CassetteStore(self.directory), FakeTransport())
+        with self.assertRaises(CassetteMiss):
+            self.post(replayer, 'never recorded')
+
+    def test_error_responses_are_not_recorded(self):
+        transport = FakeTransport(FakeResponse(429, {'error': 'rate limited'}))
+        response = self.post(ReplayClient('record', CassetteStore(self.directory), transport), 'hello')
+        self.assertEqual(response.status_code, 429)
+
+        replayer = ReplayClient('replay', CassetteStore(self.directory), FakeTransport())
+        with self.assertRaises(CassetteMiss):
+            self.post(replayer, 'hello')
+
+    def test_error_does_not_overwrite_good_recording(self):
+        transport = FakeTransport(FakeResponse(200, {'answer': 42}), FakeResponse(503, {'error': 'down'}))
+        recorder = ReplayClient('record', CassetteStore(self.directory), transport)
+        self.post(recorder, 'hello')
+        self.post(recorder, 'hello')
+
+        replayer = ReplayClient('replay', CassetteStore(self.directory), FakeTransport())
+        self.assertEqual(self.post(replayer, 'hello').json(), {'answer': 42})
+
+    def test_invalid_mode_rejected(self):
+        with self.assertRaises(ValueError):
+            ReplayClient('rewind', CassetteStore(self.directory))
+
+
+if __name__ == '__main__':
+    unittest.main()